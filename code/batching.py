@@ -0,0 +1,75 @@
+# batching.py
+# Batch-processing options shared by the NLP scripts: nlp.pipe() batch size and
+# worker count, and the command line used to pass report files
+
+import argparse
+import os
+import platform
+from thinc.api import get_current_ops
+
+# Number of reports spaCy batches together in nlp.pipe()
+BATCH_SIZE = int(os.environ.get("MED_NLP_BATCH_SIZE", "64"))
+
+
+def default_n_process():
+    """
+    Worker processes for nlp.pipe(): all cores but one, or a single process
+    on Windows and GPU where multiprocessing slows spaCy down
+    """
+    if platform.system() == "Windows" or get_current_ops().device_type == "gpu":
+        return 1
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def resolve_n_process(n_process, n_texts, batch_size):
+    """
+    Worker count actually passed to nlp.pipe(). As in spaCy, -1 means one worker
+    per CPU core; the count is capped at the number of batches so that small
+    inputs do not start idle workers.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    if n_process == -1:
+        n_process = os.cpu_count() or 1
+    n_batches = -(-n_texts // batch_size)
+    return max(1, min(n_process, n_batches))
+
+
+def _batch_size(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def _n_process(value):
+    number = int(value)
+    if number != -1 and number < 1:
+        raise argparse.ArgumentTypeError(f"must be -1 (all cores) or at least 1, got {value}")
+    return number
+
+
+def parse_args(description):
+    """
+    Parses the report files and the nlp.pipe() options of an NLP script
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("reports", nargs="*", help="Text files with one medical report each (default: built-in sample)")
+    parser.add_argument("--batch-size", type=_batch_size, default=BATCH_SIZE, help="Reports per nlp.pipe() batch")
+    parser.add_argument("--n-process", type=_n_process, default=default_n_process(),
+                        help="Worker processes for nlp.pipe() (-1: one per CPU core)")
+    return parser.parse_args()
+
+
+def read_reports(paths):
+    """
+    Reads one report per file; returns None when no file is given
+    so the scripts fall back to their sample report
+    """
+    if not paths:
+        return None
+    texts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
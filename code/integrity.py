@@ -0,0 +1,44 @@
+# integrity.py
+# Canonical serialization, integrity digests and record timestamps shared by
+# the NLP scripts and the smart contract simulation
+
+import hashlib
+import os
+from datetime import datetime, timezone
+import orjson
+import xxhash
+
+# Hash with SHA-256 only when cryptographic binding is needed (MED_NLP_SECURE_HASH=1),
+# e.g. when anchoring to a real chain; xxh3-128 is enough for the simulation's integrity checks
+SECURE_HASH = os.environ.get("MED_NLP_SECURE_HASH", "0") == "1"
+
+
+def canonical_bytes(data):
+    """
+    Serializes data to compact canonical JSON bytes (sorted keys) for hashing
+    """
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+
+
+def digest(payload):
+    """
+    Integrity digest of canonical bytes: xxh3-128 by default, SHA-256 when SECURE_HASH is set
+    """
+    if SECURE_HASH:
+        return hashlib.sha256(payload).hexdigest()
+    return xxhash.xxh3_128(payload).hexdigest()
+
+
+def entities_digest(payload):
+    """
+    Fingerprint of canonical entity bytes that oracles compare to reach consensus.
+    It only tells outputs apart, so it stays xxh3-64 even when SECURE_HASH is set
+    """
+    return xxhash.xxh3_64(payload).hexdigest()
+
+
+def utc_timestamp():
+    """
+    ISO-8601 UTC timestamp with a 'Z' suffix, the format of every hashed record
+    """
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z")
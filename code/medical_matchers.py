@@ -0,0 +1,58 @@
+# medical_matchers.py
+# spaCy pipeline loading and custom medical keyword patterns shared by the NLP scripts.
+# Keywords are tokenized once into entity_ruler token patterns, so registering them
+# never runs the statistical pipeline over the keyword lists
+
+import functools
+import spacy
+
+# Pipeline components never used by the scripts (only entities and token text are read)
+EXCLUDED_PIPES = ("parser", "tagger", "lemmatizer", "attribute_ruler")
+
+
+def surface_forms(term):
+    """Singular and plural spelling of a keyword (e.g. 'headache', 'headaches')"""
+    return (term, term + "s")
+
+
+def keyword_patterns(nlp, keywords):
+    """
+    Builds case-insensitive entity_ruler token patterns from {label: [terms]}.
+    Every spelling is tokenized once with nlp.make_doc; the pattern id is the keyword itself.
+    """
+    patterns = []
+    for label, terms in keywords.items():
+        for term in terms:
+            for form in surface_forms(term):
+                patterns.append({
+                    "label": label,
+                    "pattern": [{"LOWER": token.lower_} for token in nlp.make_doc(form)],
+                    "id": term
+                })
+    return patterns
+
+
+def add_keyword_ruler(nlp, keywords):
+    """
+    Adds an entity_ruler tagging the keywords ahead of the statistical NER,
+    so they are matched inside the pipeline and show up in doc.ents
+    """
+    ruler = nlp.add_pipe("entity_ruler", before="ner")
+    ruler.add_patterns(keyword_patterns(nlp, keywords))
+    return ruler
+
+
+def load_nlp(keywords, name="en_core_web_sm"):
+    """
+    Loads the spaCy model without the unused components and with the keywords
+    ({label: [terms]}) tagged by an entity_ruler. Loaded once per process and
+    keyword set, then reused on later calls.
+    """
+    return _load_nlp(name, tuple((label, tuple(terms)) for label, terms in keywords.items()))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_nlp(name, keywords):
+    nlp = spacy.load(name, exclude=list(EXCLUDED_PIPES))
+    add_keyword_ruler(nlp, dict(keywords))
+    return nlp
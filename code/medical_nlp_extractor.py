@@ -2,32 +2,40 @@
 # This script simulates the extraction of medical entities from free-text reports using spaCy,
 # and enhances detection with custom keyword matching for drugs, symptoms, and tests
 
-import spacy
-from datetime import datetime
-
-def main():
-    print("🚀 Starting NLP processing for medical data simulation...\n")
-
-    # Load spaCy English model
-    try:
-        nlp = spacy.load("en_core_web_sm")
-    except OSError:
-        print("❌ Error: spaCy model 'en_core_web_sm' not found.")
-        print("👉 Please install it with: python -m spacy download en_core_web_sm\n")
-        return
-
-    # Sample medical report
-    text = """
+import os
+import sys
+import orjson
+from batching import BATCH_SIZE, parse_args, read_reports, resolve_n_process
+from integrity import utc_timestamp
+from medical_matchers import load_nlp
+from pprint import pprint
+from typing import List, Optional
+
+# Print structured output with pprint instead of orjson (MED_NLP_VERBOSE=1)
+VERBOSE = os.environ.get("MED_NLP_VERBOSE", "0") == "1"
+
+# Custom lists for manual recognition, per entity label
+custom_keywords = {
+    "DRUG": ["ibuprofen", "paracetamol", "aspirin", "naproxen"],
+    "SYMPTOM": ["headache", "fatigue", "pain", "fever", "cough"],
+    "TEST": ["MRI", "CT", "X-ray", "ultrasound", "scan"]
+}
+
+# Sample medical report
+SAMPLE_REPORT = """
     The patient underwent an MRI scan due to persistent headaches and fatigue.
     No critical condition was detected. The doctor prescribed ibuprofen 400mg twice daily for pain relief.
     """
 
+
+def extract_report(doc, timestamp):
+    """
+    Displays the entities of a processed report and returns its structured output
+    """
+    text = doc.text
+
     print("📄 Input Medical Report:")
     print(text)
-    print("\n🔍 Starting NLP pipeline...\n")
-
-    # Apply NLP pipeline
-    doc = nlp(text)
 
     # Display entities recognized by spaCy
     print("🧾 Entities Extracted by spaCy:")
@@ -39,14 +47,13 @@ def main():
 
     print()
 
-    # Custom lists for manual recognition
-    custom_drugs = ["ibuprofen", "paracetamol", "aspirin", "naproxen"]
-    custom_symptoms = ["headache", "fatigue", "pain", "fever", "cough"]
-    custom_tests = ["MRI", "CT", "X-ray", "ultrasound", "scan"]
+    # Keywords tagged by the entity_ruler; the pattern id is the keyword itself
+    def detected(label):
+        return list(dict.fromkeys(ent.ent_id_ for ent in doc.ents if ent.label_ == label))
 
     # Drug detection
     print("💊 Custom Drug Detection:")
-    detected_drugs = [drug for drug in custom_drugs if drug.lower() in doc.text.lower()]
+    detected_drugs = detected("DRUG")
     if detected_drugs:
         for drug in detected_drugs:
             print(f" - '{drug}' detected manually")
@@ -55,7 +62,7 @@ def main():
 
     # Symptom detection
     print("\n🩺 Custom Symptom Detection:")
-    detected_symptoms = [symptom for symptom in custom_symptoms if symptom.lower() in doc.text.lower()]
+    detected_symptoms = detected("SYMPTOM")
     if detected_symptoms:
         for symptom in detected_symptoms:
             print(f" - '{symptom}' detected manually")
@@ -64,7 +71,7 @@ def main():
 
     # Test/exam detection
     print("\n🔬 Custom Medical Test Detection:")
-    detected_tests = [test for test in custom_tests if test.lower() in doc.text.lower()]
+    detected_tests = detected("TEST")
     if detected_tests:
         for test in detected_tests:
             print(f" - '{test}' detected manually")
@@ -72,21 +79,52 @@ def main():
         print(" - No medical test keywords found")
 
     # Create structured output
-    print("\n📊 Structured Output (JSON format):")
-
     structured_data = {
         "raw_text": text.strip(),
         "spacy_entities": [{"text": ent.text, "label": ent.label_} for ent in doc.ents],
         "custom_drug_matches": detected_drugs,
         "custom_symptom_matches": detected_symptoms,
         "custom_test_matches": detected_tests,
-        "timestamp": str(datetime.now()),
+        "timestamp": timestamp,
         "status": "NLP extraction completed"
     }
 
     # Print JSON-like structure
-    from pprint import pprint
-    pprint(structured_data)
+    print("\n📊 Structured Output (JSON format):")
+    if __debug__ and VERBOSE:
+        pprint(structured_data)
+    else:
+        sys.stdout.write(orjson.dumps(structured_data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE).decode())
+
+    return structured_data
+
+
+def main(texts: Optional[List[str]] = None, batch_size: int = BATCH_SIZE, n_process: int = 1):
+    print("🚀 Starting NLP processing for medical data simulation...\n")
+
+    if texts is None:
+        texts = [SAMPLE_REPORT]
+
+    n_process = resolve_n_process(n_process, len(texts), batch_size)
+
+    # Load spaCy English model
+    try:
+        nlp = load_nlp(custom_keywords)
+    except OSError:
+        print("❌ Error: spaCy model 'en_core_web_sm' not found.")
+        print("👉 Please install it with: python -m spacy download en_core_web_sm\n")
+        return
+
+    print("\n🔍 Starting NLP pipeline...\n")
+
+    # Apply NLP pipeline to all reports in batches; each report is printed
+    # as soon as it is processed, so nothing is kept across reports
+    for i, doc in enumerate(nlp.pipe(texts, batch_size=batch_size, n_process=n_process)):
+        if i % batch_size == 0:
+            timestamp = utc_timestamp()
+        extract_report(doc, timestamp)
+
 
 if __name__ == "__main__":
-    main()
+    args = parse_args("Extract medical entities from free-text reports")
+    main(read_reports(args.reports), batch_size=args.batch_size, n_process=args.n_process)
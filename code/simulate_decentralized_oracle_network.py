@@ -0,0 +1,324 @@
+# simulate_decentralized_oracle_network.py
+# Simulates a decentralized oracle network with consensus and HITL fallback
+
+from batching import BATCH_SIZE, parse_args, read_reports, resolve_n_process
+from integrity import canonical_bytes, digest, entities_digest, utc_timestamp
+from medical_matchers import load_nlp
+from spacy.attrs import ENT_TYPE
+from spacy.strings import get_string_id
+import hashlib
+import io
+import orjson
+import random
+import numpy as np
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, TextIO
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; classify_tokens() then runs in NumPy
+    njit = None
+
+# 🔹 Custom medical term lists
+CUSTOM_KEYWORDS = {
+    "DRUG": ["ibuprofen", "paracetamol", "aspirin", "naproxen", "penicillin"],
+    "SYMPTOM": ["headache", "fever", "cough", "fatigue", "nausea"]
+}
+
+# 🔹 Confidence of the labels assigned by the custom entity_ruler
+CUSTOM_CONFIDENCE = {"DRUG": 0.95, "SYMPTOM": 0.90}
+
+# 🔹 Token classes returned by classify_tokens(), with the entity label hashes they match
+ENT_NONE, ENT_DRUG, ENT_SYMPTOM, ENT_OTHER = 0, 1, 2, 3
+DRUG_ID = np.uint64(get_string_id("DRUG"))
+SYMPTOM_ID = np.uint64(get_string_id("SYMPTOM"))
+
+# 🔹 System threshold
+CONFIDENCE_THRESHOLD = 0.7
+
+# 🔹 Canonical JSON of an enriched oracle payload, keys already sorted
+ENRICHED_KEYS = frozenset(["entities", "node_id", "source", "status", "timestamp"])
+ENRICHED_TEMPLATE = b'{"entities":%s,"node_id":%s,"source":"NLP Module","status":"validated","timestamp":%s}'
+
+# 🔹 Sample text
+SAMPLE_REPORT = """
+    The patient underwent an MRI scan due to persistent headaches and fatigue.
+    No critical condition was found. The doctor prescribed ibuprofen 400mg twice daily for pain relief.
+    """
+
+
+def enriched_bytes(data: Dict, entity_bytes: Optional[bytes] = None) -> bytes:
+    """
+    Canonical bytes of an oracle payload built by OracleNode.enrich_with_metadata().
+    Only the variable fields are serialized; any other schema falls back to canonical_bytes().
+    `entity_bytes` is the canonical serialization of data["entities"], when already computed.
+    """
+    if data.keys() != ENRICHED_KEYS or data["source"] != "NLP Module" or data["status"] != "validated":
+        return canonical_bytes(data)
+    if entity_bytes is None:
+        entity_bytes = canonical_bytes(data["entities"])
+    return ENRICHED_TEMPLATE % (
+        entity_bytes,
+        orjson.dumps(data["node_id"]),
+        orjson.dumps(data["timestamp"]),
+    )
+
+
+def _classify_tokens_loop(ent_types, drug_id, symptom_id):
+    """Token class per ENT_TYPE hash, as a tight loop for Numba to compile."""
+    codes = np.zeros(ent_types.shape[0], dtype=np.int8)
+    for i in range(ent_types.shape[0]):
+        ent_type = ent_types[i]
+        if ent_type == drug_id:
+            codes[i] = ENT_DRUG
+        elif ent_type == symptom_id:
+            codes[i] = ENT_SYMPTOM
+        elif ent_type != 0:
+            codes[i] = ENT_OTHER
+    return codes
+
+
+def _classify_tokens_numpy(ent_types, drug_id, symptom_id):
+    """Token class per ENT_TYPE hash, vectorized in NumPy."""
+    codes = np.where(ent_types != 0, ENT_OTHER, ENT_NONE).astype(np.int8)
+    codes[ent_types == drug_id] = ENT_DRUG
+    codes[ent_types == symptom_id] = ENT_SYMPTOM
+    return codes
+
+
+classify_tokens = njit(cache=True)(_classify_tokens_loop) if njit else _classify_tokens_numpy
+
+
+class OracleNode:
+    """
+    Represents a decentralized oracle node that validates NLP results
+    and signs the output with ECDSA-style digital signature (simulated).
+    """
+
+    def __init__(self, node_id: str, private_key: str):
+        self.node_id = node_id
+        self.private_key = private_key  # Simulated private key
+        self._priv_bytes = private_key.encode('utf-8')
+
+    def validate_entities(self, doc) -> Dict[str, List]:
+        """Validates entities using custom logic and returns one list per field (texts, labels, confidences)."""
+        validated = {"texts": [], "labels": [], "confidences": []}
+        texts = validated["texts"]
+        labels = validated["labels"]
+        confidences = validated["confidences"]
+
+        # Tokens are classified in compiled code; only entity tokens reach the Python loop
+        codes = classify_tokens(doc.to_array(ENT_TYPE), DRUG_ID, SYMPTOM_ID)
+        for i in np.flatnonzero(codes):
+            token = doc[i]
+
+            if codes[i] != ENT_OTHER:
+                texts.append(token.text)
+                labels.append(token.ent_type_)
+                confidences.append(CUSTOM_CONFIDENCE[token.ent_type_])
+
+            else:
+                confidence = 0.85
+                if confidence >= CONFIDENCE_THRESHOLD:
+                    texts.append(token.text)
+                    labels.append(token.ent_type_)
+                    confidences.append(confidence)
+
+        return validated
+
+    def enrich_with_metadata(self, validated_entities: Dict[str, List], timestamp: Optional[str] = None) -> Dict:
+        """Adds contextual metadata and timestamp (current time if not given)."""
+        return {
+            "entities": validated_entities,
+            "timestamp": timestamp or utc_timestamp(),
+            "source": "NLP Module",
+            "node_id": self.node_id,
+            "status": "validated"
+        }
+
+    def generate_hash(self, data: Dict, entity_bytes: Optional[bytes] = None) -> str:
+        """Generates integrity hash (xxh3-128, or SHA-256 with SECURE_HASH)."""
+        return digest(enriched_bytes(data, entity_bytes))
+
+    def sign_hash(self, h: str) -> str:
+        """Simulates ECDSA signature using private key (over the raw digest bytes)."""
+        signer = hashlib.sha256(bytes.fromhex(h))
+        signer.update(self._priv_bytes)
+        return signer.hexdigest()
+
+    def process(self, doc, timestamp: Optional[str] = None, out: Optional[TextIO] = None) -> Optional[Dict]:
+        """Full oracle processing pipeline. Log lines go to `out` (stdout by default)."""
+        try:
+            print(f"\n🔍 Oracle {self.node_id} validating...", file=out)
+
+            entities = self.validate_entities(doc)
+            if not entities["texts"]:
+                print(f"⚠️  Oracle {self.node_id}: No valid entities found.", file=out)
+                return None
+
+            # Entities are serialized once, for both the payload hash and the entities hash
+            entity_bytes = canonical_bytes(entities)
+            enriched = self.enrich_with_metadata(entities, timestamp)
+            h = self.generate_hash(enriched, entity_bytes)
+            signature = self.sign_hash(h)
+
+            result = {
+                "node_id": self.node_id,
+                "data": enriched,
+                "hash": h,
+                "signature": signature,
+                # Entities only (no node_id/timestamp), so agreeing oracles share this hash
+                "entities_hash": entities_digest(entity_bytes)
+            }
+
+            print(f"✅ Oracle {self.node_id} output: {len(entities['texts'])} entities validated.", file=out)
+            return result
+
+        except Exception as e:
+            print(f"❌ Oracle {self.node_id} failed: {e}", file=out)
+            return None
+
+
+def consensus_mechanism(oracle_outputs: List[Dict], threshold: int = 2) -> Optional[Dict]:
+    """
+    Performs consensus (e.g., 2-out-of-3 agreement) on validated data.
+    Oracles agree when they extracted the same entities, i.e. share an entities_hash.
+    Returns the final package if consensus is reached, else None.
+    """
+    print(f"\n🔐 Running Consensus Mechanism (threshold = {threshold})...")
+
+    if len(oracle_outputs) < threshold:
+        print("❌ Not enough oracle responses for consensus.")
+        return None
+
+    # Count votes per entities hash and keep the oracles behind the majority
+    valid_responses = [o for o in oracle_outputs if o is not None]
+    votes = Counter(o["entities_hash"] for o in valid_responses)
+    majority_hash, count = votes.most_common(1)[0] if votes else (None, 0)
+
+    if count >= threshold:
+        agreeing = [o for o in valid_responses if o["entities_hash"] == majority_hash]
+        print(f"✅ Consensus achieved: {count} of {len(oracle_outputs)} oracles agree.")
+        return {
+            "consensus": "success",
+            "final_package": agreeing[0]["data"],
+            "aggregated_hashes": [o["hash"] for o in agreeing],
+            "signatures": [o["signature"] for o in agreeing]
+        }
+    else:
+        print(f"❌ Consensus failed: only {count} matching response(s).")
+        return None
+
+
+def trigger_human_in_the_loop(input_text: str, oracle_outputs: List[Dict], timestamp: Optional[str] = None):
+    """
+    Simulates human validation when consensus fails.
+    In a real system, this would call a web interface.
+    The correction is stamped with `timestamp` (the batch timestamp; current time if not given).
+    """
+    print("\n🚨 Consensus failed. Triggering Human-in-the-Loop (HITL)...")
+    print("📝 Original text:", input_text)
+    print("🔍 Oracle discrepancies:")
+    for o in oracle_outputs:
+        if o:
+            entities = o['data']['entities']
+            ents = [f"{text}({label})" for text, label in zip(entities['texts'], entities['labels'])]
+            print(f"  - {o['node_id']}: {', '.join(ents)}")
+
+    print("\n👩‍⚕️ Human validator reviewing...")
+    # Simulate correction
+    corrected = {
+        "entities": {
+            "texts": ["MRI", "headache", "fatigue", "ibuprofen"],
+            "labels": ["PROCEDURE", "SYMPTOM", "SYMPTOM", "DRUG"],
+            "confidences": [0.98, 0.95, 0.93, 0.97]
+        },
+        "correction_reason": "Low confidence in NLP extraction for 'MRI'",
+        "validator_id": "HITL_001",
+        "timestamp": timestamp or utc_timestamp()
+    }
+    print("✅ Correction applied by human validator.")
+    return corrected
+
+
+def run_network(doc, oracles: List[OracleNode], executor: ThreadPoolExecutor, timestamp: str) -> Dict:
+    """
+    Runs every oracle on a processed report, then consensus or HITL fallback.
+    Returns the final data package with its blockchain hash.
+    """
+    print("📄 Input Medical Report:")
+    print(doc.text)
+
+    # Each oracle processes the shared NLP output in its own thread,
+    # logging to a private buffer that is printed once all are done
+    def run_oracle(oracle):
+        log = io.StringIO()
+        return oracle.process(doc, timestamp, log), log.getvalue()
+
+    oracle_results = []
+    for result, log in executor.map(run_oracle, oracles):
+        print(log, end="")
+        oracle_results.append(result)
+
+    # Consensus
+    consensus_result = consensus_mechanism(oracle_results, threshold=2)
+
+    final_data = None
+    if consensus_result:
+        final_data = consensus_result["final_package"]
+        print("\n✅ Data approved by consensus. Ready for blockchain.")
+    else:
+        # Fallback to HITL
+        corrected_data = trigger_human_in_the_loop(doc.text, oracle_results, timestamp)
+        final_data = corrected_data
+
+    # Final hash for blockchain
+    final_hash = digest(enriched_bytes(final_data))
+    final_data["final_hash"] = final_hash
+
+    print(f"\n📦 Final data hash: {final_hash[:16]}...")
+    return final_data
+
+
+def main(texts: Optional[List[str]] = None, batch_size: int = BATCH_SIZE, n_process: int = 1):
+    print("🚀 Starting Decentralized Oracle Network Simulation\n")
+
+    if texts is None:
+        texts = [SAMPLE_REPORT]
+
+    n_process = resolve_n_process(n_process, len(texts), batch_size)
+
+    # Load spaCy model
+    try:
+        nlp = load_nlp(CUSTOM_KEYWORDS)
+    except OSError:
+        print("❌ Error: Could not load spaCy model.")
+        print("👉 Run: python -m spacy download en_core_web_sm")
+        return
+
+    # Initialize 3 oracle nodes (decentralized network)
+    oracles = [
+        OracleNode("Oracle_A", "priv_key_A_123"),
+        OracleNode("Oracle_B", "priv_key_B_456"),
+        OracleNode("Oracle_C", "priv_key_C_789")
+    ]
+
+    # Apply NLP once per report, in batches, and share each doc with all oracles.
+    # Each final package is saved for the smart contract as one JSON line
+    saved = 0
+    with open("validated_data_for_blockchain.jsonl", "wb") as f, \
+            ThreadPoolExecutor(max_workers=len(oracles)) as executor:
+        for i, doc in enumerate(nlp.pipe(texts, batch_size=batch_size, n_process=n_process)):
+            if i % batch_size == 0:
+                timestamp = utc_timestamp()
+            final_data = run_network(doc, oracles, executor, timestamp)
+            f.write(orjson.dumps(final_data, option=orjson.OPT_APPEND_NEWLINE))
+            saved += 1
+
+    print(f"\n📦 {saved} final package(s) saved to 'validated_data_for_blockchain.jsonl'")
+
+
+if __name__ == "__main__":
+    args = parse_args("Simulate a decentralized oracle network with consensus and HITL fallback")
+    main(read_reports(args.reports), batch_size=args.batch_size, n_process=args.n_process)
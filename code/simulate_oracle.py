@@ -1,72 +1,94 @@
 # simulate_oracle_with_custom_lists.py
 # Simulates an AI oracle that validates NLP results before blockchain transmission
 
-import spacy
-from datetime import datetime
-import hashlib
-import json
+import os
+import sys
+from batching import BATCH_SIZE, parse_args, read_reports, resolve_n_process
+from integrity import canonical_bytes, digest, utc_timestamp
+from medical_matchers import load_nlp
+from spacy.attrs import ENT_TYPE
+from pprint import pprint
+import numpy as np
+import orjson
+from typing import List, Optional
+
+# Print packages with pprint instead of orjson (MED_NLP_VERBOSE=1)
+VERBOSE = os.environ.get("MED_NLP_VERBOSE", "0") == "1"
+
+# Canonical JSON of an enriched oracle payload, keys already sorted
+ENRICHED_KEYS = frozenset(["institution", "patient_id", "raw_entities", "status", "timestamp"])
+ENRICHED_TEMPLATE = b'{"institution":"CHU Alger","patient_id":%s,"raw_entities":%s,"status":"Oracle validation passed","timestamp":%s}'
 
 # ✅ Define your custom medical term lists here
-custom_drugs = ["ibuprofen", "paracetamol", "aspirin", "naproxen", "penicillin"]
-custom_symptoms = ["headache", "fever", "cough", "fatigue", "nausea"]
+custom_keywords = {
+    "DRUG": ["ibuprofen", "paracetamol", "aspirin", "naproxen", "penicillin"],
+    "SYMPTOM": ["headache", "fever", "cough", "fatigue", "nausea"]
+}
+
+
+# Sample text
+SAMPLE_REPORT = """
+    The patient underwent an MRI scan due to persistent headaches and fatigue.
+    No critical condition was found. The doctor prescribed ibuprofen 400mg twice daily for pain relief.
+    """
 
 
 def validate_nlp_entities(doc, confidence_threshold=0.7):
     """
     Validates and enriches entities extracted by spaCy,
     using custom medical dictionaries for drug and symptom detection.
+    Returns one list per field (texts, labels, confidences), the layout consumed by the smart contract.
     """
 
     print("\n🔍 Oracle Validation Started...\n")
-
-    validated_entities = []
-
-    # Check each token against custom lists
-    for token in doc:
-        lower_text = token.text.lower()
-
-        if any(drug in lower_text for drug in custom_drugs):
+    validated_entities = {"texts": [], "labels": [], "confidences": []}
+    texts = validated_entities["texts"]
+    labels = validated_entities["labels"]
+    confidences = validated_entities["confidences"]
+
+    # Custom drugs and symptoms carry the entity_ruler's labels;
+    # entity tokens are selected in NumPy so the others never reach the Python loop
+    ent_types = doc.to_array(ENT_TYPE)
+    for i in np.flatnonzero(ent_types):
+        token = doc[i]
+
+        if token.ent_type_ == "DRUG":
             label = "DRUG"
             confidence = 0.95
-            validated_entities.append({
-                "text": token.text,
-                "label": label,
-                "confidence": confidence
-            })
+            texts.append(token.text)
+            labels.append(label)
+            confidences.append(confidence)
             print(f"💊 '{token.text}' → {label} | Confidence: {confidence:.2f}")
 
-        elif any(symptom in lower_text for symptom in custom_symptoms):
+        elif token.ent_type_ == "SYMPTOM":
             label = "SYMPTOM"
             confidence = 0.90
-            validated_entities.append({
-                "text": token.text,
-                "label": label,
-                "confidence": confidence
-            })
+            texts.append(token.text)
+            labels.append(label)
+            confidences.append(confidence)
             print(f"🩺 '{token.text}' → {label} | Confidence: {confidence:.2f}")
 
         # Also check spaCy's standard entities
-        elif token.ent_type_:
+        else:
             label = token.ent_type_
             confidence = 0.85
             if confidence >= confidence_threshold:
-                validated_entities.append({
-                    "text": token.text,
-                    "label": label,
-                    "confidence": confidence
-                })
+                texts.append(token.text)
+                labels.append(label)
+                confidences.append(confidence)
                 print(f"🧾 '{token.text}' → {label} | Confidence: {confidence:.2f}")
 
     return validated_entities
 
 
-def enrich_with_metadata(validated_entities):
+def enrich_with_metadata(validated_entities, timestamp=None):
     """
-    Adds metadata such as timestamp, source, institution, patient ID
+    Adds metadata such as timestamp, source, institution, patient ID.
+    `timestamp` defaults to the current time.
     """
     enriched_data = {
         "raw_entities": validated_entities,
-        "timestamp": str(datetime.now()),
+        "timestamp": timestamp or utc_timestamp(),
         "institution": "CHU Alger",
         "patient_id": "PAT_123456",
         "status": "Oracle validation passed"
@@ -74,51 +96,51 @@ def enrich_with_metadata(validated_entities):
     return enriched_data
 
 
-def generate_hash(data):
+def enriched_bytes(data):
     """
-    Generates SHA-256 hash for data integrity verification
+    Canonical bytes of the payload built by enrich_with_metadata(), rendering only
+    its variable fields; any other schema falls back to canonical_bytes()
     """
-    input_str = json.dumps(data, sort_keys=True).encode('utf-8')
-    return hashlib.sha256(input_str).hexdigest()
+    if (data.keys() != ENRICHED_KEYS
+            or data["institution"] != "CHU Alger"
+            or data["status"] != "Oracle validation passed"):
+        return canonical_bytes(data)
+    return ENRICHED_TEMPLATE % (
+        orjson.dumps(data["patient_id"]),
+        canonical_bytes(data["raw_entities"]),
+        orjson.dumps(data["timestamp"]),
+    )
 
 
-def main():
-    print("🚀 Starting NLP + AI Oracle Simulation\n")
+def generate_hash(data):
+    """
+    Generates hash for data integrity verification
+    """
+    return digest(enriched_bytes(data))
 
-    # Load spaCy model
-    try:
-        nlp = spacy.load("en_core_web_sm")
-    except Exception as e:
-        print("❌ Error: Could not load spaCy model.")
-        print("👉 Run: python -m spacy download en_core_web_sm")
-        raise e
 
-    # Sample text
-    text = """
-    The patient underwent an MRI scan due to persistent headaches and fatigue.
-    No critical condition was found. The doctor prescribed ibuprofen 400mg twice daily for pain relief.
+def process_report(doc, timestamp):
+    """
+    Runs oracle validation on a processed report.
+    Returns the enriched and hashed data, or None if validation failed.
     """
-
     print("📄 Input Medical Report:")
-    print(text)
-
-    # Apply NLP pipeline
-    doc = nlp(text)
+    print(doc.text)
 
     print("\n🧾 Tokens & Labels from spaCy:")
     for token in doc:
-        if token.ent_type_ or any(token.text.lower() in lst for lst in [custom_drugs, custom_symptoms]):
-            print(f"{token.text:15} → {token.ent_type_ or 'Custom'}")
+        if token.ent_type_:
+            print(f"{token.text:15} → {token.ent_type_}")
 
     # Validate using AI oracle logic
     validated_entities = validate_nlp_entities(doc)
 
-    if not validated_entities:
+    if not validated_entities["texts"]:
         print("\n⚠️ No valid entities found. Oracle validation failed.")
-        return
+        return None
 
     # Enrich with metadata
-    enriched_data = enrich_with_metadata(validated_entities)
+    enriched_data = enrich_with_metadata(validated_entities, timestamp)
 
     # Generate hash for secure transmission
     hash_value = generate_hash(enriched_data)
@@ -126,14 +148,45 @@ def main():
 
     # Print structured output
     print("\n📦 Data Ready for Blockchain Transmission:")
-    from pprint import pprint
-    pprint(enriched_data)
+    if __debug__ and VERBOSE:
+        pprint(enriched_data)
+    else:
+        sys.stdout.write(orjson.dumps(enriched_data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE).decode())
+
+    return enriched_data
+
+
+def main(texts: Optional[List[str]] = None, batch_size: int = BATCH_SIZE, n_process: int = 1):
+    print("🚀 Starting NLP + AI Oracle Simulation\n")
+
+    if texts is None:
+        texts = [SAMPLE_REPORT]
+
+    n_process = resolve_n_process(n_process, len(texts), batch_size)
+
+    # Load spaCy model
+    try:
+        nlp = load_nlp(custom_keywords)
+    except Exception as e:
+        print("❌ Error: Could not load spaCy model.")
+        print("👉 Run: python -m spacy download en_core_web_sm")
+        raise e
+
+    # Apply NLP pipeline to all reports in batches,
+    # saving each package as one JSON line as soon as it is validated
+    saved = 0
+    with open("data_for_blockchain.jsonl", "wb") as f:
+        for i, doc in enumerate(nlp.pipe(texts, batch_size=batch_size, n_process=n_process)):
+            if i % batch_size == 0:
+                timestamp = utc_timestamp()
+            enriched_data = process_report(doc, timestamp)
+            if enriched_data is not None:
+                f.write(orjson.dumps(enriched_data, option=orjson.OPT_APPEND_NEWLINE))
+                saved += 1
 
-    # Save to JSON
-    with open("data_for_blockchain.json", "w") as f:
-        json.dump(enriched_data, f, indent=2)
-    print("\n✅ Data saved to 'data_for_blockchain.json'")
+    print(f"\n✅ {saved} report(s) saved to 'data_for_blockchain.jsonl'")
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args("Validate NLP results with an AI oracle before blockchain transmission")
+    main(read_reports(args.reports), batch_size=args.batch_size, n_process=args.n_process)
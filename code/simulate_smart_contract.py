@@ -2,9 +2,11 @@
 # Simulates a basic blockchain smart contract that verifies off-chain hash
 # and validates the consistency between off-chain and on-chain data
 
-import hashlib
-import json
-from datetime import datetime
+import orjson
+import os
+import sys
+from pprint import pprint
+from integrity import canonical_bytes, digest, utc_timestamp
 
 
 # Simulated smart contract address
@@ -13,13 +15,20 @@ CONTRACT_ADDRESS = "0x1234567890abcdef1234567890abcdef12345678"
 # Simulated on-chain storage
 on_chain_data = {}
 
+# Print the on-chain record with pprint instead of orjson (MED_NLP_VERBOSE=1)
+VERBOSE = os.environ.get("MED_NLP_VERBOSE", "0") == "1"
+
+# Reimbursement rule: a headache-like symptom treated with one of these drugs
+HEADACHE_KEYWORDS = frozenset(["headache", "headaches", "pain", "migraine"])
+DRUG_KEYWORDS = frozenset(["ibuprofen", "paracetamol", "aspirin"])
+
 
 def verify_hash(data_off_chain, stored_hash):
     """
-    Compares the hash of the off-chain data with the one stored on-chain
+    Compares the hash of the off-chain data with the one stored on-chain.
+    The data is always serialized again, so any change since storage is detected.
     """
-    input_str = json.dumps(data_off_chain, sort_keys=True).encode('utf-8')
-    calculated_hash = hashlib.sha256(input_str).hexdigest()
+    calculated_hash = digest(canonical_bytes(data_off_chain))
 
     print(f"\n🔗 Off-chain hash : {calculated_hash}")
     print(f"📦 On-chain hash  : {stored_hash}")
@@ -48,21 +57,24 @@ def execute_smart_contract(data_off_chain, stored_hash):
     # Step 2: Apply business logic
     print("🔍 Analyzing data for conditional execution...")
 
-    drugs = [ent["text"].lower() for ent in data_off_chain["valid_entities"] if ent["label"] == "DRUG"]
-    symptoms = [ent["text"].lower() for ent in data_off_chain["valid_entities"] if ent["label"] == "SYMPTOM"]
-
-    # Check if any variation of headache or pain is present
-    headache_keywords = ["headache", "headaches", "pain", "migraine"]
-    drug_keywords = ["ibuprofen", "paracetamol", "aspirin"]
+    entities = data_off_chain["valid_entities"]
+    texts, labels = entities["texts"], entities["labels"]
 
-    has_headache = any(symptom in symptoms for symptom in headache_keywords)
-    has_drug = any(drug in drugs for drug in drug_keywords)
+    # Single pass over the entities, sorting them into drugs and symptoms
+    drugs = set()
+    symptoms = set()
+    for text, label in zip(texts, labels):
+        if label == "DRUG":
+            drugs.add(text.lower())
+        elif label == "SYMPTOM":
+            symptoms.add(text.lower())
 
-    if has_headache and has_drug:
-        matched_headache = next((k for k in headache_keywords if k in symptoms), None)
-        matched_drug = next((d for d in drug_keywords if d in drugs), None)
+    # Check if any variation of headache or pain is present
+    matched_headache = HEADACHE_KEYWORDS & symptoms
+    matched_drug = DRUG_KEYWORDS & drugs
 
-        print(f"💊 Condition matched: '{matched_headache}' + '{matched_drug}'")
+    if matched_headache and matched_drug:
+        print(f"💊 Condition matched: '{', '.join(sorted(matched_headache))}' + '{', '.join(sorted(matched_drug))}'")
         print("💰 Triggering reimbursement process...")
         return True
     else:
@@ -74,28 +86,29 @@ def store_on_chain(data_off_chain):
     """
     Simulates storing the hash of off-chain data on-chain
     """
-    input_str = json.dumps(data_off_chain, sort_keys=True).encode('utf-8')
-    stored_hash = hashlib.sha256(input_str).hexdigest()
+    stored_hash = digest(canonical_bytes(data_off_chain))
 
     on_chain_data["hash"] = stored_hash
-    on_chain_data["timestamp"] = str(datetime.now())
+    on_chain_data["timestamp"] = utc_timestamp()
     on_chain_data["status"] = "Data hash stored on-chain"
     on_chain_data["contract_address"] = CONTRACT_ADDRESS
 
     print("\n📦 Data stored on-chain:")
-    from pprint import pprint
-    pprint(on_chain_data)
+    if __debug__ and VERBOSE:
+        pprint(on_chain_data)
+    else:
+        sys.stdout.write(orjson.dumps(on_chain_data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE).decode())
 
     return stored_hash
 
 
 # Example off-chain data from your AI Oracle
 off_chain_data = {
-    "valid_entities": [
-        {"text": "headaches", "label": "SYMPTOM", "confidence": 0.90},
-        {"text": "fatigue", "label": "SYMPTOM", "confidence": 0.90},
-        {"text": "ibuprofen", "label": "DRUG", "confidence": 0.95}
-    ],
+    "valid_entities": {
+        "texts": ["headaches", "fatigue", "ibuprofen"],
+        "labels": ["SYMPTOM", "SYMPTOM", "DRUG"],
+        "confidences": [0.90, 0.90, 0.95]
+    },
     "timestamp": "2025-07-14T12:34:56Z",
     "institution": "CHU Alger",
     "patient_id": "PAT_123456",